@@ -4,14 +4,21 @@ import argparse
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-# --- The correct import for the library you want to use ---
-from google import genai
 from dotenv import load_dotenv
 from pdf2image import convert_from_path
 from tqdm import tqdm
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The shared genai.Client and retry helper live alongside the Gemini runner.
+from runners.api_runner import _get_bucket, _get_client, _with_retry, estimate_tokens
+
 # A specific prompt to instruct the model to perform a perfect transcription.
 OCR_PROMPT = """
 Your task is to perform a perfect, high-fidelity OCR transcription of this document image.
@@ -45,16 +52,32 @@ def load_config(config_path="config.json"):
         print(f"[Error] Failed to load or parse config file. Error: {e}", file=sys.stderr)
         return {}
 
-def create_ground_truth(pdf_path: Path, output_json_path: Path, model_name: str, dpi: int, poppler_path: str = None):
+def _transcribe_page(client, model_name: str, page_image, page_num: int, bucket=None):
+    """
+    Transcribes a single page image. Returns the page number alongside the text
+    so results can be collected out of order.
+    """
+    if bucket:
+        bucket.reserve(estimate_tokens(page_image, OCR_PROMPT))
+    response = _with_retry(lambda: client.models.generate_content(
+        model=model_name,
+        contents=[OCR_PROMPT, page_image]
+    ))
+    return page_num, response.text.strip()
+
+def create_ground_truth(pdf_path: Path, output_json_path: Path, model_name: str, dpi: int, poppler_path: str = None, concurrency: int = 4,
+                        rpm: int = None, tpm: int = None):
     """
     Generates a ground truth JSON file from a PDF using the genai.Client.
+    Pages are transcribed concurrently, with at most `concurrency` requests in flight,
+    and paced to stay under the optional `rpm`/`tpm` per-minute quotas.
     """
     print(f"Starting ground truth generation for '{pdf_path.name}'...")
     print(f"Using model: {model_name}")
 
     # --- 1. Initialize the GenAI Client ---
     try:
-        client = genai.Client()
+        client = _get_client(pool_size=concurrency)
         if not os.getenv("GOOGLE_API_KEY"):
              raise ValueError("GOOGLE_API_KEY environment variable not set.")
     except Exception as e:
@@ -64,32 +87,47 @@ def create_ground_truth(pdf_path: Path, output_json_path: Path, model_name: str,
     # --- 2. Convert PDF to a list of PIL Images ---
     print(f"Converting PDF to images at {dpi} DPI (this may take a moment)...")
     try:
-        page_images = convert_from_path(pdf_path=str(pdf_path), dpi=dpi, poppler_path=poppler_path)
+        # thread_count lets Poppler rasterize page ranges in parallel. On macOS each
+        # worker holds open file handles, so very large PDFs may need a higher `ulimit -n`.
+        page_images = convert_from_path(
+            pdf_path=str(pdf_path), dpi=dpi, poppler_path=poppler_path,
+            thread_count=max(1, (os.cpu_count() or 1) - 1)
+        )
         print(f"Successfully converted {len(page_images)} pages.")
     except Exception as e:
         print(f"[Error] Failed to convert PDF. Is Poppler installed? Error: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # --- 3. Process each page with the client ---
+    # --- 3. Process the pages concurrently with the client ---
+    # The calls are I/O-bound, so a small thread pool sized to the API tier's
+    # concurrency budget overlaps the waiting without tripping rate limits.
     ground_truth_data = {}
-    for i, page_image in enumerate(tqdm(page_images, desc="Transcribing pages")):
-        page_num = i + 1
-        try:
-            response = client.models.generate_content(
-                model=model_name,
-                contents=[OCR_PROMPT, page_image]
-            )
-            transcribed_text = response.text.strip()
-            ground_truth_data[str(page_num)] = transcribed_text
-        except Exception as e:
-            print(f"\n[Warning] Failed to process page {page_num}. Error: {e}")
-            ground_truth_data[str(page_num)] = f"[ERROR: Could not transcribe page {page_num}]"
+    bucket = _get_bucket(model_name, rpm, tpm)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        futures = {
+            executor.submit(_transcribe_page, client, model_name, page_image, i + 1, bucket): i + 1
+            for i, page_image in enumerate(page_images)
+        }
+        for future in tqdm(as_completed(futures), total=len(futures), desc="Transcribing pages"):
+            page_num = futures[future]
+            try:
+                _, transcribed_text = future.result()
+                ground_truth_data[str(page_num)] = transcribed_text
+            except Exception as e:
+                print(f"\n[Warning] Failed to process page {page_num}. Error: {e}")
+                ground_truth_data[str(page_num)] = f"[ERROR: Could not transcribe page {page_num}]"
+
+    # Keep the output in page order regardless of completion order.
+    ground_truth_data = dict(sorted(ground_truth_data.items(), key=lambda kv: int(kv[0])))
 
     # --- 4. Save the results to a JSON file ---
     print(f"\nSaving ground truth data to '{output_json_path}'...")
     output_json_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(output_json_path, 'w', encoding='utf-8') as f:
-        json.dump(ground_truth_data, f, indent=2, ensure_ascii=False)
+    if orjson is not None:
+        output_json_path.write_bytes(orjson.dumps(ground_truth_data, option=orjson.OPT_INDENT_2))
+    else:
+        with open(output_json_path, 'w', encoding='utf-8') as f:
+            json.dump(ground_truth_data, f, indent=2, ensure_ascii=False)
     print("Ground truth generation complete!")
 
 
@@ -108,6 +146,9 @@ def cli():
     parser.add_argument("--model_name", help="Name of the Gemini model to use.", default=gt_config.get("model_name", "gemini-1.5-pro-latest"))
     parser.add_argument("--dpi", type=int, help="DPI for converting PDF pages.", default=gt_config.get("dpi", 300))
     parser.add_argument("--poppler_path", help="Optional path to Poppler binaries.", default=gt_config.get("poppler_path"))
+    parser.add_argument("--rpm", type=int, help="Requests-per-minute quota to pace calls against.", default=gt_config.get("rpm"))
+    parser.add_argument("--tpm", type=int, help="Tokens-per-minute quota to pace calls against.", default=gt_config.get("tpm"))
+    parser.add_argument("--concurrency", type=int, help="Maximum number of concurrent Gemini requests.", default=gt_config.get("gemini_concurrency", 4))
     
     args = parser.parse_args()
 
@@ -125,7 +166,10 @@ def cli():
         output_json_path=Path(args.output_json),
         model_name=args.model_name,
         dpi=args.dpi,
-        poppler_path=args.poppler_path
+        poppler_path=args.poppler_path,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        tpm=args.tpm
     )
 
 if __name__ == "__main__":
@@ -1,23 +1,35 @@
 # main.py
 
 import argparse
+import contextlib
+import functools
+import os
 import shutil
 import tempfile
 import gc
-import json
 import csv
 import sys
+import textwrap
+import threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 import importlib
+import inspect
 import logging
-from dotenv import load_dotenv
 
 from utils import (
     read_gemini_ground_truth,
     load_config,
     setup_logger,
-    compute_all_metrics
+    flush_log_buffers,
+    unbuffer_logging,
+    load_env,
+    compute_all_metrics_batch,
+    json_dumps,
+    json_loads,
+    OCRCache,
+    preprocess_for_ocr
 )
 
 logger = logging.getLogger(__name__)
@@ -25,15 +37,51 @@ logger = logging.getLogger(__name__)
 # ======================================================================================
 #  Runner Configuration
 # ======================================================================================
+def _lazy_class(class_path):
+    """Returns a zero-arg factory that imports 'package.module.Class' only when called."""
+    module_path, class_name = class_path.rsplit('.', 1)
+    return lambda: getattr(importlib.import_module(module_path), class_name)
+
+# Each entry is a factory, so a runner's heavy dependencies (torch, easyocr, paddle)
+# are only imported if that runner is actually enabled.
 RUNNER_MAP = {
-    'tesseract': 'runners.tesseract_runner.TesseractRunner',
-    'easyocr': 'runners.easyocr_runner.EasyOCRRunner',
-    'paddle_ppstructure': 'runners.paddle_runner.PaddleStructureRunner',
-    'gemini_api': 'runners.api_runner.GeminiRunner',
-    'florence2_base': 'runners.local_llm_runner.FlorenceRunner',
-    'granite_docling': 'runners.granite_runner.GraniteRunner'
+    'tesseract': _lazy_class('runners.tesseract_runner.TesseractRunner'),
+    'easyocr': _lazy_class('runners.easyocr_runner.EasyOCRRunner'),
+    'paddle_ppstructure': _lazy_class('runners.paddle_runner.PaddleStructureRunner'),
+    'gemini_api': _lazy_class('runners.api_runner.GeminiRunner'),
+    'florence2_base': _lazy_class('runners.local_llm_runner.FlorenceRunner'),
+    'granite_docling': _lazy_class('runners.granite_runner.GraniteRunner')
+}
+
+# Runners that are CPU-bound and cheap enough to instantiate once per worker process.
+# GPU and API runners stay serial to avoid device contention and quota bursts.
+# Can be overridden per model with "parallel_pages" in config.json.
+PARALLEL_PAGES_DEFAULT = {
+    'tesseract': True,
+}
+
+# Pages between explicit full garbage collections during a model's run.
+GC_EVERY_N_PAGES = 50
+
+# Minimum pages each pdftoppm process rasterizes within a PageStream chunk. Every
+# process re-parses the PDF, so one process per page wastes most of its work.
+PAGES_PER_RASTER_PROCESS = 4
+
+# Rasterization DPI per runner, used when neither --dpi nor benchmark_run.dpi is set.
+# Tesseract needs full resolution, while the vision-LM runners downsample internally,
+# so rasterizing them at 300 DPI only wastes time. Runners not listed use DEFAULT_DPI.
+DEFAULT_DPI = 150
+PREFERRED_DPI = {
+    'tesseract': 300,
+    'gemini_api': 150,
+    'florence2_base': 150,
+    'granite_docling': 150,
 }
 
+# For these runners the preferred DPI also caps an explicit --dpi, so it can only
+# ever lower the resolution they are fed.
+DPI_CAPPED_RUNNERS = frozenset({'gemini_api', 'florence2_base', 'granite_docling'})
+
 # ======================================================================================
 #  Helper Functions
 # ======================================================================================
@@ -51,10 +99,294 @@ def resolve_input_path(cmd_path, default_dir="sample_data"):
         return fallback_path
     raise FileNotFoundError(f"Input file not found at '{cmd_path}' or in '{default_dir}'.")
 
+def jsonl_to_json(jsonl_path, json_path):
+    """
+    Converts a JSON-lines file into a pretty-printed JSON array, one record at a
+    time so the whole summary never has to be held in memory.
+    """
+    with open(jsonl_path, 'r', encoding='utf-8') as src, open(json_path, 'w', encoding='utf-8') as dst:
+        dst.write('[')
+        first = True
+        for line in src:
+            if not line.strip():
+                continue
+            record = textwrap.indent(json_dumps(json_loads(line), indent=True), '  ')
+            dst.write(('\n' if first else ',\n') + record)
+            first = False
+        dst.write('\n]' if not first else ']')
+
+class PageStream:
+    """
+    Rasterizes a PDF into `output_folder` on a background thread, a chunk of pages
+    at a time, so OCR can start on the first pages while later ones are still being
+    converted. Behaves like a read-only list of image paths: indexing blocks until
+    that page has been written, and later passes replay the already converted pages.
+    """
+    def __init__(self, pdf_path, dpi, output_folder, poppler_path=None, chunk_size=None,
+                 fmt='png', image_quality=90):
+        self.total_pages = pdfinfo_from_path(str(pdf_path), poppler_path=poppler_path)["Pages"]
+        # Size chunks so every pdftoppm process gets several pages; by default one
+        # chunk keeps all but one core busy.
+        max_threads = max(1, (os.cpu_count() or 1) - 1)
+        if chunk_size is None:
+            chunk_size = max_threads * PAGES_PER_RASTER_PROCESS
+        self._thread_count = max(1, min(max_threads, chunk_size // PAGES_PER_RASTER_PROCESS))
+        self._paths = []
+        self._error = None
+        self._done = False
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(
+            target=self._produce,
+            args=(pdf_path, dpi, output_folder, poppler_path, chunk_size, fmt, image_quality),
+            daemon=True
+        )
+        self._thread.start()
+
+    def _produce(self, pdf_path, dpi, output_folder, poppler_path, chunk_size, fmt, image_quality):
+        jpegopt = {"quality": image_quality, "optimize": True} if fmt == 'jpeg' else None
+        try:
+            for first_page in range(1, self.total_pages + 1, chunk_size):
+                if self._stop.is_set():
+                    break
+                last_page = min(first_page + chunk_size - 1, self.total_pages)
+                # pdf2image splits the chunk's page range across `thread_count` pdftoppm
+                # processes. On macOS each worker holds open file handles, so very large
+                # PDFs may need a higher `ulimit -n`.
+                paths = convert_from_path(
+                    str(pdf_path), dpi=dpi, output_folder=output_folder,
+                    fmt=fmt, jpegopt=jpegopt, poppler_path=poppler_path, paths_only=True,
+                    first_page=first_page, last_page=last_page,
+                    thread_count=min(self._thread_count,
+                                     max(1, (last_page - first_page + 1) // PAGES_PER_RASTER_PROCESS))
+                )
+                with self._cond:
+                    self._paths.extend(paths)
+                    self._cond.notify_all()
+            logger.info(f"Finished converting {len(self._paths)} pages.")
+        except Exception as e:
+            logger.error("PDF conversion failed.", exc_info=True)
+            self._error = e
+        finally:
+            with self._cond:
+                self._done = True
+                self._cond.notify_all()
+
+    def __len__(self):
+        return self.total_pages
+
+    def __getitem__(self, idx):
+        with self._cond:
+            self._cond.wait_for(lambda: idx < len(self._paths) or self._done)
+            if idx < len(self._paths):
+                return self._paths[idx]
+        if self._error:
+            raise RuntimeError(f"PDF conversion failed before page {idx + 1}") from self._error
+        raise IndexError(idx)
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+@functools.lru_cache(maxsize=None)
+def _mps_available():
+    torch = sys.modules.get("torch")
+    try:
+        return bool(torch and torch.backends.mps.is_available())
+    except AttributeError:
+        return False
+
+def release_accelerator_memory():
+    """
+    Empties the MPS allocator cache after a model is released. torch is only looked
+    up if a runner already imported it, so CPU-only runs never pay for loading torch,
+    and the MPS capability probe happens once per process.
+    """
+    if "torch" in sys.modules and _mps_available():
+        sys.modules["torch"].mps.empty_cache()
+
+def is_known_runner(runner_key):
+    """A runner is either registered in RUNNER_MAP or given as a dotted 'module.Class' path."""
+    return runner_key in RUNNER_MAP or '.' in runner_key
+
+@functools.lru_cache(maxsize=None)
+def resolve_runner_class(runner_key):
+    """
+    Resolves a runner key to its class, importing the module on first use. Results are
+    memoized, so models sharing a runner do not repeat the lookup; failures are not
+    cached and are left to the caller to handle.
+    """
+    if runner_key in RUNNER_MAP:
+        return RUNNER_MAP[runner_key]()
+    # Config-driven entries outside the registry may name the class directly.
+    return _lazy_class(runner_key)()
+
+def build_runner(runner_key, params):
+    """Imports and instantiates the runner class registered under `runner_key`."""
+    runner_class = resolve_runner_class(runner_key)
+
+    if runner_key == 'easyocr':
+        return runner_class(['en'])
+    return runner_class(**params)
+
+def runner_settings(runner, params):
+    """
+    The runner's effective constructor settings: its signature defaults overlaid with
+    `params`. Keying the cache on these means a changed default (e.g. a larger token
+    budget) invalidates results that were produced under the old one.
+    """
+    settings = {
+        name: p.default
+        for name, p in inspect.signature(type(runner).__init__).parameters.items()
+        if p.default is not inspect.Parameter.empty
+    }
+    settings.update(params)
+    return settings
+
+def page_spec(model_config, dpi, image_format):
+    """
+    Returns the (dpi, format) a runner's pages should be rasterized at. A model's own
+    "dpi" wins, then an explicit global `dpi` (capped for DPI_CAPPED_RUNNERS), then
+    PREFERRED_DPI. `requires_png` opts a runner out of lossy JPEG pages.
+    """
+    runner_key = model_config["runner"]
+    if "dpi" in model_config:
+        runner_dpi = model_config["dpi"]
+    elif dpi is None:
+        runner_dpi = PREFERRED_DPI.get(runner_key, DEFAULT_DPI)
+    elif runner_key in DPI_CAPPED_RUNNERS:
+        runner_dpi = min(dpi, PREFERRED_DPI[runner_key])
+    else:
+        runner_dpi = dpi
+    fmt = 'png' if model_config.get("requires_png", False) else image_format
+    return runner_dpi, fmt
+
+# ======================================================================================
+#  Page-Parallel OCR Workers
+# ======================================================================================
+_worker_runner = None
+
+def _init_page_worker(runner_key, params):
+    global _worker_runner
+    unbuffer_logging()
+    _worker_runner = build_runner(runner_key, params)
+
+def _ocr_input(img_path, preprocess):
+    """The image a runner actually sees: the raw page, or its preprocessed copy."""
+    if preprocess is None:
+        return str(img_path)
+    return preprocess_for_ocr(img_path, **preprocess)
+
+def _ocr_one(img_path, preprocess=None):
+    return _worker_runner.run_image(_ocr_input(img_path, preprocess))
+
+def _ocr_pages(runner, model_config, page_images, cache, page_workers, batch_size=1):
+    """
+    Yields (page_idx, page_text) in page order. Cached pages are served from disk;
+    for runners with `parallel_pages` enabled, the remaining pages are OCR'd in a
+    process pool with one runner instance per worker. Runners exposing
+    `run_images` are fed the remaining pages in chunks of `batch_size`. With
+    `preprocess` set, each page is binarized/deskewed before it reaches the runner;
+    it may be `true` or an object of preprocess_for_ocr options such as `max_dim`,
+    or `binarize: false` to only downscale.
+    """
+    runner_key = model_config["runner"]
+    params = model_config.get("params", {})
+    preprocess = model_config.get("preprocess", False)
+    preprocess = {} if preprocess is True else (preprocess or None)
+    settings = runner_settings(runner, params)
+    params_key = OCRCache.params_key(settings if preprocess is None else {**settings, "preprocess": preprocess})
+    parallel = model_config.get("parallel_pages", PARALLEL_PAGES_DEFAULT.get(runner_key, False))
+    batch_size = model_config.get("batch_size", batch_size)
+    batched = batch_size > 1 and hasattr(runner, "run_images")
+
+    total_pages = len(page_images)
+    image_keys, cached = {}, {}
+
+    def lookup(page_idx):
+        # Cache lookups happen lazily so pages are only touched once they are rasterized.
+        if not cache:
+            return None
+        if page_idx not in cached:
+            image_keys[page_idx] = OCRCache.image_key(page_images[page_idx - 1])
+            cached[page_idx] = cache.get(runner.name, image_keys[page_idx], params_key)
+        return cached[page_idx]
+
+    executor, futures, batch_results = None, {}, {}
+    next_submit = 1
+    if parallel and page_workers > 1 and total_pages > 1:
+        logger.info(f"  Dispatching pages across {page_workers} worker processes...")
+        # Forked workers inherit the log buffer, so empty it first to keep lines in order
+        flush_log_buffers()
+        executor = ProcessPoolExecutor(
+            max_workers=page_workers, initializer=_init_page_worker, initargs=(runner_key, params)
+        )
+
+    try:
+        for page_idx in range(1, total_pages + 1):
+            logger.info(f"  -> Processing page {page_idx}/{total_pages}...")
+            if executor:
+                # Keep a bounded window of pages in flight ahead of the consumer.
+                while next_submit <= min(total_pages, page_idx + 2 * page_workers):
+                    if lookup(next_submit) is None:
+                        futures[next_submit] = executor.submit(
+                            _ocr_one, str(page_images[next_submit - 1]), preprocess
+                        )
+                    next_submit += 1
+
+            page_text = lookup(page_idx)
+            if page_text is not None:
+                logger.info(f"     Cache hit for page {page_idx}.")
+                yield page_idx, page_text
+                continue
+            try:
+                if page_idx in futures:
+                    page_text = futures.pop(page_idx).result()
+                elif batched:
+                    if page_idx not in batch_results:
+                        batch, next_idx = [page_idx], page_idx + 1
+                        while len(batch) < batch_size and next_idx <= total_pages:
+                            if lookup(next_idx) is None:
+                                batch.append(next_idx)
+                            next_idx += 1
+                        try:
+                            texts = runner.run_images([_ocr_input(page_images[i - 1], preprocess) for i in batch])
+                        except Exception as e:
+                            # Every page of a failed batch reports the error; none is cached
+                            texts = [e] * len(batch)
+                        batch_results.update(zip(batch, texts))
+                    page_text = batch_results.pop(page_idx)
+                    if isinstance(page_text, Exception):
+                        raise page_text
+                else:
+                    page_text = runner.run_image(_ocr_input(page_images[page_idx - 1], preprocess))
+                # Only reached on success: failures raise and must never be cached
+                if cache:
+                    cache.set(runner.name, image_keys[page_idx], params_key, page_text or '')
+            except Exception as e:
+                logger.error(f"Model '{runner.name}' failed on page {page_idx}.", exc_info=True)
+                page_text = f"[OCR_ERROR: {e}]"
+            yield page_idx, page_text
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
 # ======================================================================================
 #  Core Processing Logic
 # ======================================================================================
-def process(pdf_path, gemini_gt_path, out_dir, dpi, poppler_path, models_to_run_config):
+def process(pdf_path, gemini_gt_path, out_dir, dpi, poppler_path, models_to_run_config,
+            use_cache=True, cache_dir=".ocr_cache", page_workers=None, batch_size=4,
+            image_format="jpeg", image_quality=90, summary_json=True):
     out_dir = Path(out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
     logger.info(f"Results will be saved in: {out_dir.resolve()}")
@@ -68,14 +400,18 @@ def process(pdf_path, gemini_gt_path, out_dir, dpi, poppler_path, models_to_run_
     logger.info(f"Loading ground truth from: {gemini_gt_path}")
     gemini_gt = read_gemini_ground_truth(gemini_gt_path)
 
-    logger.info(f"Converting PDF '{pdf_path.name}' to images at {dpi} DPI...")
-    with tempfile.TemporaryDirectory() as tmpdir:
-        page_images = convert_from_path(
-            str(pdf_path), dpi=dpi, output_folder=tmpdir,
-            fmt='png', poppler_path=poppler_path, paths_only=True
-        )
-        total_pages = len(page_images)
-        logger.info(f"Successfully converted {total_pages} pages.")
+    specs = sorted({page_spec(cfg, dpi, image_format) for cfg in models_to_run_config})
+    with tempfile.TemporaryDirectory() as tmpdir, contextlib.ExitStack() as stack:
+        # One background conversion per (DPI, format) combination needed by the enabled models.
+        page_streams = {}
+        for spec_dpi, fmt in specs:
+            logger.info(f"Converting PDF '{pdf_path.name}' to {fmt} images at {spec_dpi} DPI in the background...")
+            spec_dir = Path(tmpdir) / f"{spec_dpi}dpi_{fmt}"
+            spec_dir.mkdir()
+            page_streams[(spec_dpi, fmt)] = stack.enter_context(
+                PageStream(pdf_path, spec_dpi, spec_dir, poppler_path, fmt=fmt, image_quality=image_quality)
+            )
+        logger.info(f"PDF has {len(page_streams[specs[0]])} pages.")
 
         runners = []
         logger.info("Initializing enabled OCR models...")
@@ -83,21 +419,12 @@ def process(pdf_path, gemini_gt_path, out_dir, dpi, poppler_path, models_to_run_
             runner_key = model_config["runner"]
             params = model_config.get("params", {})
             
-            if runner_key in RUNNER_MAP:
+            if is_known_runner(runner_key):
                 try:
-                    class_path = RUNNER_MAP[runner_key]
-                    module_path, class_name = class_path.rsplit('.', 1)
-                    
-                    logger.info(f"  -> Dynamically importing '{class_name}' for '{model_config['name']}'...")
-                    module = importlib.import_module(module_path)
-                    runner_class = getattr(module, class_name)
+                    logger.info(f"  -> Dynamically importing runner '{runner_key}' for '{model_config['name']}'...")
+                    instance = build_runner(runner_key, params)
                     
-                    if runner_key == 'easyocr':
-                        instance = runner_class(['en'])
-                    else:
-                        instance = runner_class(**params)
-                    
-                    runners.append(instance)
+                    runners.append((instance, model_config))
                     logger.info(f"  [SUCCESS] Initialized '{model_config['name']}'")
                 except Exception as e:
                     logger.error(f"  [FAILURE] Could not initialize '{model_config['name']}'.", exc_info=True)
@@ -108,28 +435,46 @@ def process(pdf_path, gemini_gt_path, out_dir, dpi, poppler_path, models_to_run_
             logger.critical("No models were successfully initialized. Exiting.")
             return
 
-        summary_rows = []
+        cache = OCRCache(cache_dir) if use_cache else None
+        if cache:
+            logger.info(f"OCR result cache enabled at: {Path(cache_dir).resolve()}")
+
+        if page_workers is None:
+            page_workers = max(1, (os.cpu_count() or 2) // 2)
+
+        # Rows are streamed to disk after each model so partial results survive a
+        # crash; page texts are saved as soon as they are OCR'd.
+        csv_path = out_dir / 'summary.csv'
+        jsonl_path = out_dir / 'summary.jsonl'
+        csv_file = stack.enter_context(open(csv_path, 'w', newline='', encoding='utf-8'))
+        jsonl_file = stack.enter_context(open(jsonl_path, 'w', encoding='utf-8'))
+        csv_writer = None
+        rows_written = 0
+        corpus_rows = []
+
         logger.info("Starting OCR benchmark...")
-        for runner in runners:
+        for runner, model_config in runners:
             model_out_dir = out_dir / runner.name
             model_out_dir.mkdir(parents=True, exist_ok=True)
-            logger.info(f"--- Running Model: {runner.name} ---")
-            for page_idx, img_path in enumerate(page_images, start=1):
-                logger.info(f"  -> Processing page {page_idx}/{total_pages}...")
-                try:
-                    page_text = runner.run_image(str(img_path))
-                except Exception as e:
-                    logger.error(f"Model '{runner.name}' failed on page {page_idx}.", exc_info=True)
-                    page_text = f"[OCR_ERROR: {e}]"
-                
+            spec = page_spec(model_config, dpi, image_format)
+            logger.info(f"--- Running Model: {runner.name} ({spec[0]} DPI {spec[1]} pages) ---")
+            page_images = page_streams[spec]
+            page_idxs, gts, hyps = [], [], []
+            for page_idx, page_text in _ocr_pages(runner, model_config, page_images, cache, page_workers, batch_size):
                 save_text(model_out_dir / f"page_{page_idx}.txt", page_text)
-                
-                gt = gemini_gt.get(page_idx, '')
-                hyp = page_text or ''
-                
-                # Call the new comprehensive metrics engine
-                metrics = compute_all_metrics(gt, hyp)
-                
+                page_idxs.append(page_idx)
+                gts.append(gemini_gt.get(page_idx, ''))
+                hyps.append(page_text or '')
+
+                # A full collection per page costs more than Tesseract-sized pages take
+                # to OCR; the page's objects are freed by refcounting anyway.
+                if page_idx % GC_EVERY_N_PAGES == 0:
+                    gc.collect()
+
+            # Score the whole run at once: the character metrics are vectorized across
+            # pages, and corpus BLEU needs every page anyway.
+            page_metrics, corpus_bleu = compute_all_metrics_batch(gts, hyps)
+            for page_idx, gt, hyp, metrics in zip(page_idxs, gts, hyps, page_metrics):
                 row = {
                     'model': runner.name,
                     'page': page_idx,
@@ -138,31 +483,33 @@ def process(pdf_path, gemini_gt_path, out_dir, dpi, poppler_path, models_to_run_
                 }
                 row.update(metrics)
                 
-                summary_rows.append(row)
-                
-                del page_text, hyp, gt, metrics
-                gc.collect()
+                if csv_writer is None:
+                    csv_writer = csv.DictWriter(csv_file, fieldnames=list(row.keys()))
+                    csv_writer.writeheader()
+                csv_writer.writerow(row)
+                jsonl_file.write(json_dumps(row) + '\n')
+                rows_written += 1
+            csv_file.flush()
+            jsonl_file.flush()
+
+            corpus_rows.append({'model': runner.name, 'pages': len(page_idxs), 'corpus_bleu': corpus_bleu})
+            logger.info(f"  Corpus BLEU for {runner.name}: "
+                        + (f"{corpus_bleu:.4f}" if corpus_bleu is not None else "n/a (no ground truth)"))
             
             logger.info(f"--- Finished Model: {runner.name}. Releasing resources. ---")
             del runner
             gc.collect()
-            try:
-                import torch
-                if torch.backends.mps.is_available():
-                    torch.mps.empty_cache()
-            except (ImportError, AttributeError):
-                pass
-
-    if summary_rows:
-        logger.info("Writing summary files...")
-        csv_path = out_dir / 'summary.csv'
-        with open(csv_path, 'w', newline='', encoding='utf-8') as cf:
-            fields = list(summary_rows[0].keys())
-            writer = csv.DictWriter(cf, fieldnames=fields)
-            writer.writeheader()
-            writer.writerows(summary_rows)
-        (out_dir / 'summary.json').write_text(json.dumps(summary_rows, indent=2), encoding='utf-8')
-        logger.info(f"Summary written to {csv_path.name} and summary.json")
+            release_accelerator_memory()
+
+    if corpus_rows:
+        (out_dir / 'summary_corpus.json').write_text(json_dumps(corpus_rows, indent=True), encoding='utf-8')
+        logger.info("Corpus-level metrics per model written to summary_corpus.json")
+
+    if rows_written:
+        if summary_json:
+            jsonl_to_json(jsonl_path, out_dir / 'summary.json')
+        logger.info(f"Summary of {rows_written} rows written to {csv_path.name} and {jsonl_path.name}"
+                    + (" (plus summary.json)" if summary_json else ""))
 
     logger.info(f"Benchmark finished. Results are in {out_dir.resolve()}")
 
@@ -171,7 +518,7 @@ def process(pdf_path, gemini_gt_path, out_dir, dpi, poppler_path, models_to_run_
 # ======================================================================================
 def cli():
     setup_logger()
-    load_dotenv()
+    load_env()
 
     config = load_config()
     benchmark_config = config.get("benchmark_run", {})
@@ -195,8 +542,26 @@ def cli():
     parser.add_argument('--pdf', default=benchmark_config.get("default_pdf"))
     parser.add_argument('--gemini_gt', default=benchmark_config.get("default_gemini_gt"))
     parser.add_argument('--out_dir', default=benchmark_config.get("default_out_dir", "results"))
-    parser.add_argument('--dpi', type=int, default=benchmark_config.get("dpi", 150))
+    parser.add_argument('--dpi', type=int, default=benchmark_config.get("dpi"),
+                        help="Rasterization DPI for models without their own \"dpi\" in config.json. "
+                             "Capped at the preferred DPI for the vision-LM runners "
+                             f"({', '.join(sorted(DPI_CAPPED_RUNNERS))}). "
+                             "If unset, each runner uses its preferred DPI.")
     parser.add_argument('--poppler_path', default=benchmark_config.get("poppler_path"))
+    parser.add_argument('--cache_dir', default=benchmark_config.get("cache_dir", ".ocr_cache"))
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                        default=benchmark_config.get("use_cache", True),
+                        help="Ignore and do not update the on-disk OCR result cache.")
+    parser.add_argument('--page_workers', type=int, default=benchmark_config.get("page_workers"),
+                        help="Worker processes for runners with parallel_pages enabled.")
+    parser.add_argument('--batch_size', type=int, default=benchmark_config.get("batch_size", 4),
+                        help="Pages per generate() call for runners that support batching.")
+    parser.add_argument('--image_format', choices=['jpeg', 'png'], default=benchmark_config.get("image_format", "jpeg"),
+                        help="Format for rasterized pages; runners with requires_png always get PNG.")
+    parser.add_argument('--image_quality', type=int, default=benchmark_config.get("image_quality", 90))
+    parser.add_argument('--no-summary-json', dest='summary_json', action='store_false',
+                        default=benchmark_config.get("summary_json", True),
+                        help="Skip converting summary.jsonl into a summary.json array.")
     
     args = parser.parse_args()
 
@@ -206,7 +571,14 @@ def cli():
         out_dir=args.out_dir,
         dpi=args.dpi,
         poppler_path=args.poppler_path,
-        models_to_run_config=models_to_run_config
+        models_to_run_config=models_to_run_config,
+        use_cache=args.use_cache,
+        cache_dir=args.cache_dir,
+        page_workers=args.page_workers,
+        batch_size=args.batch_size,
+        image_format=args.image_format,
+        image_quality=args.image_quality,
+        summary_json=args.summary_json
     )
 
 if __name__ == '__main__':
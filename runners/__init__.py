@@ -1,7 +1,20 @@
-# runners/__init__.py (updated)
+# runners/__init__.py
 
-from .tesseract_runner import TesseractRunner
-from .easyocr_runner import EasyOCRRunner
-from .paddle_runner import PaddleStructureRunner
-from .api_runner import GeminiRunner  # Add this
-from .local_llm_runner import FlorenceRunner # Add this```
+import importlib
+
+# Runners are resolved lazily so that importing one runner module (e.g. the Gemini
+# helpers from create_ground_truth.py) does not drag in torch, easyocr or paddle.
+_RUNNER_MODULES = {
+    'TesseractRunner': '.tesseract_runner',
+    'EasyOCRRunner': '.easyocr_runner',
+    'PaddleStructureRunner': '.paddle_runner',
+    'GeminiRunner': '.api_runner',
+    'FlorenceRunner': '.local_llm_runner',
+    'GraniteRunner': '.granite_runner',
+}
+
+def __getattr__(name):
+    if name in _RUNNER_MODULES:
+        module = importlib.import_module(_RUNNER_MODULES[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,27 +1,156 @@
 # runners/api_runner.py
 
 import os
+import random
+import threading
+import time
+from collections import deque
+import httpx
 from google import genai
-from PIL import Image
+
+from .image_utils import load_image
+
+_CLIENT = None
+_CLIENT_LOCK = threading.Lock()
+
+def _get_client(pool_size=None):
+    """
+    Returns a process-wide genai.Client so every runner and the ground-truth script
+    share one connection pool (and its warm keep-alive connections) instead of each
+    paying its own TLS/HTTP setup. `pool_size` only takes effect on first creation
+    and should match the number of concurrent callers.
+    """
+    global _CLIENT
+    with _CLIENT_LOCK:
+        if _CLIENT is None:
+            http_options = None
+            if pool_size:
+                limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+                http_options = {"client_args": {"limits": limits}}
+            _CLIENT = genai.Client(http_options=http_options)
+        return _CLIENT
+
+# HTTP status codes that indicate a transient quota or capacity problem.
+RETRYABLE_STATUS_CODES = {429, 503}
+
+def _status_code(error):
+    """Extracts an HTTP status code from a google-genai / api_core / HTTP client error."""
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return int(code)
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+def _retry_after(error):
+    """Returns the server-requested delay in seconds, if a Retry-After header is present."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+def _with_retry(op, max_retries=5, base=1.0, cap=60.0, jitter=0.5):
+    """
+    Calls `op()` and retries it on 429/503 responses.
+
+    Honors the server's Retry-After header when present, otherwise sleeps with
+    capped exponential backoff plus random jitter. Any other error, or running
+    out of retries, re-raises the original exception.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            return op()
+        except Exception as e:
+            if _status_code(e) not in RETRYABLE_STATUS_CODES or attempt >= max_retries:
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = min(cap, base * 2 ** attempt) + random.random() * jitter
+            time.sleep(delay)
+
+class TokenBucket:
+    """
+    Client-side pacing for a per-minute request (RPM) and token (TPM) quota.
+
+    `reserve()` blocks until the call fits in the trailing 60-second window, so
+    requests that would only come back as 429s are never sent. Either limit may be
+    None to leave it unbounded. Safe to share between threads.
+    """
+    WINDOW_SECONDS = 60.0
+
+    def __init__(self, rpm=None, tpm=None, safety_multiplier=1.2):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.safety_multiplier = safety_multiplier
+        self._events = deque()  # (timestamp, tokens) of reservations inside the window
+        self._tokens_in_window = 0
+        self._lock = threading.Lock()
+
+    def _prune(self, now):
+        while self._events and now - self._events[0][0] >= self.WINDOW_SECONDS:
+            _, tokens = self._events.popleft()
+            self._tokens_in_window -= tokens
+
+    def reserve(self, est_tokens=0):
+        tokens = int(est_tokens * self.safety_multiplier)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._prune(now)
+                rpm_ok = self.rpm is None or len(self._events) < self.rpm
+                # A single oversized request is let through once the window is empty.
+                tpm_ok = (self.tpm is None or not self._events
+                          or self._tokens_in_window + tokens <= self.tpm)
+                if rpm_ok and tpm_ok:
+                    self._events.append((now, tokens))
+                    self._tokens_in_window += tokens
+                    return
+                wait = self._events[0][0] + self.WINDOW_SECONDS - now
+            time.sleep(max(wait, 0.01))
+
+_BUCKETS = {}
+_BUCKETS_LOCK = threading.Lock()
+
+def _get_bucket(model_name, rpm=None, tpm=None, safety_multiplier=1.2):
+    """Returns the shared TokenBucket for `model_name`, or None if no limits are set."""
+    if rpm is None and tpm is None:
+        return None
+    with _BUCKETS_LOCK:
+        if model_name not in _BUCKETS:
+            _BUCKETS[model_name] = TokenBucket(rpm, tpm, safety_multiplier)
+        return _BUCKETS[model_name]
+
+def estimate_tokens(image, prompt: str) -> int:
+    """Rough Gemini input-token estimate: ~750 pixels per image token, ~4 characters per text token."""
+    width, height = image.size
+    return int(width * height / 750 + len(prompt) / 4)
 
 class GeminiRunner:
     """
     A flexible OCR runner for any Google Gen AI model.
     The model name is now passed during initialization.
     """
-    def __init__(self, api_model_name: str, display_name: str):
+    def __init__(self, api_model_name: str, display_name: str, rpm: int = None, tpm: int = None,
+                 budget_safety_multiplier: float = 1.2):
         """
         Initializes the runner with a specific API model name.
 
         Args:
             api_model_name: The exact model name to be called via the API (e.g., 'gemini-2.5-flash').
             display_name: The name to use for output folders and reports (e.g., 'gemini-2.5-flash').
+            rpm: Requests-per-minute quota for this model; None disables request pacing.
+            tpm: Tokens-per-minute quota for this model; None disables token pacing.
+            budget_safety_multiplier: Headroom applied to each call's token estimate.
         """
         # The display name is used for folders and reports
         self.name = display_name
         
         try:
-            self.client = genai.Client()
+            self.client = _get_client()
             if not os.getenv("GOOGLE_API_KEY"):
                 raise ValueError("GOOGLE_API_KEY environment variable not set.")
         except Exception as e:
@@ -29,15 +158,19 @@ class GeminiRunner:
 
         # The API model name is used for the actual API call
         self.model_name = api_model_name
+        self.bucket = _get_bucket(api_model_name, rpm, tpm, budget_safety_multiplier)
         self.prompt = "Perform OCR on this document image. Extract all text content accurately, preserving the original line breaks and structure as much as possible."
 
-    def run_image(self, img_path: str) -> str:
+    def run_image(self, img_path) -> str:
+        """Transcribes a page given as a file path, PIL image or numpy array."""
         try:
-            img = Image.open(img_path)
-            response = self.client.models.generate_content(
+            img = load_image(img_path)
+            if self.bucket:
+                self.bucket.reserve(estimate_tokens(img, self.prompt))
+            response = _with_retry(lambda: self.client.models.generate_content(
                 model=self.model_name,
                 contents=[self.prompt, img]
-            )
+            ))
             return response.text.strip()
         except Exception as e:
             print(f"Error processing image with Gemini API: {e}")
@@ -1,10 +1,16 @@
 import easyocr
+import numpy as np
+
+from .image_utils import is_path, load_image
+
 class EasyOCRRunner:
     name = "easyocr"
     def __init__(self, langs=['en']):
         # use cpu on mac M4; quantize False can avoid some issues
         self.reader = easyocr.Reader(langs, gpu=False, quantize=False)
     def run_image(self, img_path):
-        res = self.reader.readtext(img_path)
+        # Paths go straight to EasyOCR's own decoder; decoded images are passed as arrays.
+        image = img_path if is_path(img_path) else np.asarray(load_image(img_path))
+        res = self.reader.readtext(image)
         texts = [r[1] for r in res]
         return "\n".join(texts)
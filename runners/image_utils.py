@@ -0,0 +1,19 @@
+# runners/image_utils.py
+
+from pathlib import Path
+from PIL import Image
+
+def load_image(image, mode: str = "RGB") -> Image.Image:
+    """
+    Returns a decoded PIL image in `mode` from a file path, a PIL image or a numpy
+    array, so callers that already hold a decoded page can skip a second decode.
+    """
+    if isinstance(image, Image.Image):
+        return image if image.mode == mode else image.convert(mode)
+    if hasattr(image, "__array_interface__"):
+        return Image.fromarray(image).convert(mode)
+    with Image.open(image) as im:
+        return im.convert(mode)
+
+def is_path(image) -> bool:
+    return isinstance(image, (str, Path))
@@ -1,5 +1,6 @@
 # runners/paddle_runner.py
 
+import logging
 import tempfile
 from pathlib import Path
 try:
@@ -8,28 +9,76 @@ try:
 except Exception:
     PADDLE_AVAILABLE = False
 
+logger = logging.getLogger(__name__)
+
+# Precisions paddleocr 3.x accepts; they only take effect for TensorRT on GPU.
+SUPPORTED_PRECISIONS = ("fp32", "fp16")
+
+def _detect_device():
+    """
+    Picks the Paddle inference device. Paddle has no Metal/MPS backend, so Apple
+    Silicon runs on CPU (with oneDNN); CUDA builds with a visible GPU use "gpu".
+    """
+    try:
+        import paddle
+        if paddle.device.is_compiled_with_cuda() and paddle.device.cuda.device_count() > 0:
+            return "gpu"
+    except Exception:
+        pass
+    return "cpu"
+
 class PaddleStructureRunner:
     name = "paddle_ppstructure"
-    def __init__(self):
+    def __init__(self, device=None, det_model_dir=None, rec_model_dir=None,
+                 precision=None, use_tensorrt=False):
+        """
+        Args:
+            device: Paddle device string ("gpu", "gpu:0", "cpu"); auto-detected if None.
+            det_model_dir: Optional directory of a text-detection inference model in
+                the PaddleOCR 3.x / PaddleX format, e.g. a smaller or fine-tuned export.
+            rec_model_dir: Optional text-recognition inference model (same as above).
+            precision: TensorRT precision, "fp32" or "fp16". paddleocr 3.x only
+                applies it together with use_tensorrt=True on GPU.
+            use_tensorrt: Build a TensorRT engine for the models (CUDA only).
+        """
         if not PADDLE_AVAILABLE:
             raise RuntimeError("PaddleOCR/PPStructure not installed")
+
+        # Route detection/recognition to the accelerator explicitly; Paddle otherwise
+        # defaults to CPU. oneDNN (MKL-DNN) kernels speed up the CPU path.
+        device = device or _detect_device()
+        inference_args = {"device": device, "enable_mkldnn": device == "cpu"}
+
+        # Custom models and TensorRT are opt-in: only forward the options that were set.
+        if det_model_dir:
+            inference_args["text_detection_model_dir"] = det_model_dir
+        if rec_model_dir:
+            inference_args["text_recognition_model_dir"] = rec_model_dir
+        if precision:
+            # Checked here so a typo fails loudly instead of tripping the fallback below
+            if precision not in SUPPORTED_PRECISIONS:
+                raise ValueError(f"Unsupported precision '{precision}'; expected one of {SUPPORTED_PRECISIONS}.")
+            inference_args["precision"] = precision
+        if use_tensorrt:
+            inference_args["use_tensorrt"] = True
         
-        # Try to initialize the full structure pipeline first
+        # Try to initialize the full structure pipeline first; both pipelines take the
+        # same device/enable_mkldnn routing through inference_args.
         try:
-            # --- THE FIX IS HERE ---
-            # PPStructureV3 requires the OLD 'use_gpu' argument.
             self.pipeline = PPStructureV3(
                 use_doc_orientation_classify=True,
-                use_doc_unwarping=False
+                use_doc_unwarping=False,
+                **inference_args
             )
             self.use_structure = True
         except Exception:
-            # If PPStructure fails, fallback to the standard PaddleOCR
-            # --- THE FIX IS ALSO HERE ---
-            # The base PaddleOCR class requires the NEW 'use_device' argument.
+            # If PPStructure fails, fallback to the standard PaddleOCR. Log why first:
+            # with bad model dirs the fallback fails too, and its error is misleading.
+            logger.warning("PPStructureV3 failed to initialize; falling back to PaddleOCR.", exc_info=True)
             self.ocr = PaddleOCR(
                 use_angle_cls=True,
-                lang='en'
+                lang='en',
+                **inference_args
             )
             self.use_structure = False
             
@@ -38,38 +87,78 @@ class PaddleStructureRunner:
             # This part uses the self.pipeline (PPStructure)
             res_iter = self.pipeline.predict_iter([img_path_or_array])
             for res in res_iter:
-                try:
-                    md = res.get_text()
-                    if md:
-                        return md
-                except Exception:
-                    pass
-                try:
-                    tmp_md = Path(tempfile.gettempdir()) / "pp_tmp.md"
-                    res.save_to_markdown(str(tmp_md))
-                    return tmp_md.read_text(encoding='utf-8')
-                except Exception:
-                    return ""
+                return self._structure_text(res)
             return ""
         else:
             # This part uses the self.ocr (standard OCR)
             raw = self.ocr.ocr(str(img_path_or_array), cls=True)
-            texts = []
             if not raw:
                 return ""
 
             flat_results = raw[0] if (isinstance(raw, list) and len(raw) > 0 and isinstance(raw[0], list)) else raw
-            
-            if flat_results is None:
-                return ""
+            return self._ocr_text(flat_results)
+
+    def run_images(self, img_paths):
+        """
+        OCRs a list of pages in one call so Paddle can batch detection and
+        recognition crops across them. Returns one text per input, in order.
+        """
+        if self.use_structure:
+            texts = [self._structure_text(res) for res in self.pipeline.predict_iter(list(img_paths))]
+        else:
+            raw = self.ocr.ocr([str(p) for p in img_paths], cls=True) or []
+            texts = [self._ocr_text(page) for page in raw]
+        # A short result list must fail the batch; padding it would cache empty pages
+        if len(texts) != len(img_paths):
+            raise RuntimeError(f"Paddle returned {len(texts)} results for {len(img_paths)} pages.")
+        return texts
+
+    @staticmethod
+    def _structure_text(res):
+        try:
+            md = res.get_text()
+            if md:
+                return md
+        except Exception:
+            pass
+        # Recent PPStructureV3 results expose the rendered markdown in memory
+        try:
+            md = getattr(res, "markdown", None)
+            if isinstance(md, dict):
+                md = md.get("markdown_texts")
+            if md:
+                return md
+        except Exception:
+            pass
+        # Last resort: render to disk, preferring RAM-backed /dev/shm where it exists
+        try:
+            shm = "/dev/shm" if Path("/dev/shm").is_dir() else None
+            with tempfile.TemporaryDirectory(dir=shm) as tmpdir:
+                tmp_md = Path(tmpdir) / "pp_tmp.md"
+                res.save_to_markdown(str(tmp_md))
+                return tmp_md.read_text(encoding='utf-8')
+        except Exception:
+            return ""
+
+    @staticmethod
+    def _ocr_extractor(first):
+        """
+        Picks the per-line text extractor from the shape of a page's first entry, so
+        the remaining lines need no type checks. Classic PaddleOCR entries look like
+        `[box, (text, score)]`; any other second slot is stringified as before.
+        """
+        try:
+            rec = first[1]
+        except (TypeError, IndexError):
+            return str
+        if isinstance(rec, (list, tuple)):
+            return lambda ent: ent[1][0]
+        return lambda ent: str(ent[1])
+
+    @classmethod
+    def _ocr_text(cls, flat_results):
+        if not flat_results:
+            return ""
 
-            for ent in flat_results:
-                try:
-                    rec = ent[1]
-                    if isinstance(rec, (list, tuple)):
-                        texts.append(rec[0])
-                    else:
-                        texts.append(str(rec))
-                except (TypeError, IndexError):
-                    texts.append(str(ent))
-            return "\n".join(texts)
\ No newline at end of file
+        extractor = cls._ocr_extractor(flat_results[0])
+        return "\n".join([extractor(ent) for ent in flat_results])
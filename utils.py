@@ -1,27 +1,57 @@
 # utils.py
 
+import atexit
+import functools
+import hashlib
 import json
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import logging
+import logging.handlers
 from colorlog import ColoredFormatter
+from dotenv import load_dotenv
 
-import Levenshtein
-from jiwer import wer, compute_measures
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:
+    cv2 = None
+
+from rapidfuzz.distance import Levenshtein
 from rapidfuzz.fuzz import ratio as fuzz_ratio
+from rapidfuzz.process import cpdist
 
 # --- Imports for Advanced Metrics ---
-from nltk.translate.bleu_score import sentence_bleu, SmoothingFunction
+import sacrebleu
 from rouge_score import rouge_scorer
 
+# Built once at import: the ROUGE scorer's Porter stemmer is costly to construct,
+# and sacrebleu.sentence_bleu would otherwise build a new BLEU metric per call
+_ROUGE_SCORER = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
+_BLEU = sacrebleu.BLEU(effective_order=True)
+
 # ======================================================================================
 #  Logger and Config Setup
 # ======================================================================================
+_LOGGER_CONFIGURED = False
+
 def setup_logger():
     """
     Sets up a project-wide logger that outputs to both console and a file.
+    Safe to call more than once; only the first call installs handlers.
     """
+    global _LOGGER_CONFIGURED
+    if _LOGGER_CONFIGURED:
+        return
+    _LOGGER_CONFIGURED = True
+
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
 
@@ -35,7 +65,13 @@ def setup_logger():
         datefmt="%Y-%m-%d %H:%M:%S"
     )
     file_handler.setFormatter(file_formatter)
-    root_logger.addHandler(file_handler)
+    # Buffer file records and write them in bulk instead of one write() per record;
+    # errors still flush immediately, and the tail is flushed at exit
+    mem_handler = logging.handlers.MemoryHandler(
+        capacity=1024, flushLevel=logging.ERROR, target=file_handler
+    )
+    root_logger.addHandler(mem_handler)
+    atexit.register(mem_handler.flush)
 
     console_handler = logging.StreamHandler(sys.stdout)
     console_formatter = ColoredFormatter(
@@ -54,6 +90,30 @@ def setup_logger():
 
     logging.getLogger(__name__).info(f"Logger configured. Log file at: {log_file_path}")
 
+def flush_log_buffers():
+    """Writes out buffered log records, e.g. before forking worker processes."""
+    for handler in logging.getLogger().handlers:
+        handler.flush()
+
+def unbuffer_logging():
+    """
+    In a forked worker, swaps the inherited MemoryHandler for its file handler. Workers
+    exit via os._exit, so atexit never flushes their buffer, and the inherited buffer
+    would replay the parent's records the first time a worker logs an error.
+    """
+    root_logger = logging.getLogger()
+    for handler in list(root_logger.handlers):
+        if isinstance(handler, logging.handlers.MemoryHandler):
+            handler.buffer.clear()
+            root_logger.removeHandler(handler)
+            if handler.target is not None:
+                root_logger.addHandler(handler.target)
+
+@functools.lru_cache(maxsize=None)
+def load_env():
+    """Loads variables from `.env` once per process."""
+    return load_dotenv()
+
 def load_config(config_path="config.json"):
     """
     Loads the configuration file relative to this script's location.
@@ -71,9 +131,29 @@ def load_config(config_path="config.json"):
         logging.error(f"Failed to load or parse config file.", exc_info=True)
         return {}
 
+def json_dumps(obj, indent: bool = False) -> str:
+    """
+    Serializes `obj` to a JSON string (non-ASCII kept as-is), using orjson when it
+    is installed and falling back to the standard library otherwise.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode('utf-8')
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+def json_loads(data):
+    """Parses JSON text with orjson when available."""
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
 # ======================================================================================
 #  Ground Truth Reader
 # ======================================================================================
+def _page_index(stem):
+    """Parses the page number from a ground-truth file stem like 'page_12' or '12'."""
+    try:
+        return int(stem.split('_')[-1])
+    except ValueError:
+        return None
+
 def read_gemini_ground_truth(gemini_path):
     """
     Reads ground truth data from a JSON file, a text file, or a directory of text files.
@@ -91,34 +171,151 @@ def read_gemini_ground_truth(gemini_path):
             else:
                 return {1: txt.strip()}
     elif p.is_dir():
-        out = {}
-        for f in p.iterdir():
-            name = f.stem
-            try:
-                idx = int(name.split('_')[-1])
-            except:
-                try:
-                    idx = int(name)
-                except:
-                    continue
-            out[idx] = f.read_text(encoding='utf-8').strip()
-        return dict(sorted(out.items()))
+        # scandir yields the file type with each entry, so no extra stat per file
+        with os.scandir(p) as it:
+            entries = [e for e in it if e.is_file()]
+        indexed = [(idx, e.path) for e in entries
+                   if (idx := _page_index(Path(e.name).stem)) is not None]
+        # The reads are I/O-bound, so a thread pool overlaps them
+        with ThreadPoolExecutor(max_workers=8) as ex:
+            texts = ex.map(lambda path: Path(path).read_text(encoding='utf-8').strip(),
+                           [path for _, path in indexed])
+            return {idx: text for (idx, _), text in zip(indexed, texts)}
     else:
         raise FileNotFoundError(str(p))
 
 # ======================================================================================
-#  Comprehensive Metrics Engine (without Cosine Similarity)
+#  OCR Result Cache
 # ======================================================================================
-def compute_all_metrics(gt: str, hyp: str) -> dict:
+class OCRCache:
     """
-    Calculates a comprehensive suite of OCR accuracy and similarity metrics.
+    A disk-backed cache of OCR output, laid out as
+    `{cache_dir}/{runner_name}/{image_sha256}_{params_hash}.txt`.
+    """
+    # Bump when a change that no runner setting captures (a prompt, preprocessing, or
+    # output parsing) alters OCR output, so stale entries stop matching.
+    VERSION = 2
 
-    Args:
-        gt: The ground truth text.
-        hyp: The hypothesis (OCR output) text.
+    def __init__(self, cache_dir=".ocr_cache"):
+        self.cache_dir = Path(cache_dir)
 
-    Returns:
-        A dictionary containing all calculated metrics.
+    @staticmethod
+    def image_key(img_path) -> str:
+        return hashlib.sha256(Path(img_path).read_bytes()).hexdigest()
+
+    @staticmethod
+    def params_key(params) -> str:
+        return hashlib.sha256(repr((OCRCache.VERSION, params)).encode('utf-8')).hexdigest()[:16]
+
+    def _path(self, runner_name, image_key, params_key) -> Path:
+        return self.cache_dir / runner_name / f"{image_key}_{params_key}.txt"
+
+    def get(self, runner_name, image_key, params_key):
+        path = self._path(runner_name, image_key, params_key)
+        if path.exists():
+            return path.read_text(encoding='utf-8')
+        return None
+
+    def set(self, runner_name, image_key, params_key, text):
+        path = self._path(runner_name, image_key, params_key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding='utf-8')
+
+# ======================================================================================
+#  Image Preprocessing for Classic OCR Engines
+# ======================================================================================
+def _deskew(binary):
+    """Rotates a binarized page so that its dominant near-horizontal lines are level."""
+    edges = cv2.Canny(binary, 50, 150)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=100,
+                            minLineLength=binary.shape[1] // 4, maxLineGap=20)
+    if lines is None:
+        return binary
+    angles = [np.degrees(np.arctan2(y2 - y1, x2 - x1)) for x1, y1, x2, y2 in lines.reshape(-1, 4)]
+    angles = [a for a in angles if abs(a) < 15]
+    if not angles:
+        return binary
+    angle = float(np.median(angles))
+    if abs(angle) < 0.1:
+        return binary
+    h, w = binary.shape
+    matrix = cv2.getRotationMatrix2D((w / 2, h / 2), angle, 1.0)
+    return cv2.warpAffine(binary, matrix, (w, h), flags=cv2.INTER_LINEAR, borderValue=255)
+
+def preprocess_for_ocr(img_path, max_dim=None, binarize=True) -> str:
+    """
+    Produces a grayscale, adaptively binarized and deskewed copy of a page image for
+    the classic OCR engines, optionally downscaled so its longest side is at most
+    `max_dim`. With `binarize=False` the page is only downscaled, keeping its colors,
+    and returned untouched if it is already small enough. The result is written as a
+    PNG next to the source image and its path returned; an existing output is reused.
+    """
+    if cv2 is None:
+        raise RuntimeError("OpenCV (opencv-python) is required for image preprocessing.")
+
+    src = Path(img_path)
+    if not binarize:
+        return _downscale_for_ocr(src, max_dim)
+    out = src.with_name(f"{src.stem}_prep{max_dim or ''}.png")
+    if out.exists():
+        return str(out)
+
+    gray = cv2.imread(str(src), cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError(f"Could not read image '{src}'.")
+    if max_dim and max(gray.shape) > max_dim:
+        scale = max_dim / max(gray.shape)
+        gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    blurred = cv2.GaussianBlur(gray, (3, 3), 0)
+    binary = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                   cv2.THRESH_BINARY, 31, 15)
+    binary = _deskew(binary)
+
+    cv2.imwrite(str(out), binary)
+    return str(out)
+
+def _downscale_for_ocr(src, max_dim):
+    """The `binarize=False` path of preprocess_for_ocr: a plain area downscale."""
+    if not max_dim:
+        return str(src)
+    out = src.with_name(f"{src.stem}_scaled{max_dim}.png")
+    if out.exists():
+        return str(out)
+
+    img = cv2.imread(str(src), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Could not read image '{src}'.")
+    if max(img.shape[:2]) <= max_dim:
+        return str(src)
+    scale = max_dim / max(img.shape[:2])
+    img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+    cv2.imwrite(str(out), img)
+    return str(out)
+
+# ======================================================================================
+#  Comprehensive Metrics Engine (without Cosine Similarity)
+# ======================================================================================
+def compute_word_measures(gt_words: list, hyp_words: list) -> dict:
+    """
+    Word-level edit counts via rapidfuzz's C++ Levenshtein on token lists.
+    """
+    counts = {'replace': 0, 'delete': 0, 'insert': 0}
+    for op in Levenshtein.editops(gt_words, hyp_words):
+        counts[op.tag] += 1
+    errors = counts['replace'] + counts['delete'] + counts['insert']
+    return {
+        'wer': errors / len(gt_words) if gt_words else float(bool(hyp_words)),
+        'substitutions': counts['replace'],
+        'deletions': counts['delete'],
+        'insertions': counts['insert'],
+    }
+
+def _trivial_metrics(gt: str, hyp: str):
+    """
+    Returns the metrics for pages whose scores are known without any scoring work
+    (no ground truth, a perfect hypothesis or an empty one), or None otherwise.
     """
     # Handle empty ground truth case
     if not gt or not gt.strip():
@@ -128,31 +325,47 @@ def compute_all_metrics(gt: str, hyp: str) -> dict:
             'rougeL_f1': None, 'substitutions': None, 'deletions': None, 'insertions': None
         }
 
+    # Fast paths: a perfect or empty hypothesis has known scores, so skip the
+    # edit-distance, BLEU and ROUGE machinery entirely
+    if gt == hyp:
+        return {
+            'cer': 0.0, 'wer': 0.0, 'char_acc': 1.0, 'word_acc': 1.0,
+            'levenshtein_dist': 0, 'fuzz_ratio': 1.0, 'bleu': 1.0,
+            'rougeL_f1': 1.0, 'substitutions': 0, 'deletions': 0, 'insertions': 0
+        }
+    if not hyp or not hyp.strip():
+        lev_dist = Levenshtein.distance(gt, hyp)
+        cer = lev_dist / len(gt)
+        return {
+            'cer': cer, 'wer': 1.0, 'char_acc': 1.0 - cer, 'word_acc': 0.0,
+            'levenshtein_dist': lev_dist, 'fuzz_ratio': fuzz_ratio(gt, hyp) / 100.0, 'bleu': 0.0,
+            'rougeL_f1': 0.0, 'substitutions': 0, 'deletions': len(gt.split()), 'insertions': 0
+        }
+    return None
+
+def _scored_metrics(gt: str, hyp: str, gt_words: list, hyp_words: list,
+                    lev_dist: int, fuzz: float) -> dict:
+    """
+    Assembles the metrics for one page from its pre-split words and its
+    pre-computed character distance and fuzz ratio (0-1).
+    """
     # 1. Edit Distance Based Metrics
-    lev_dist = Levenshtein.distance(gt, hyp)
     cer = lev_dist / len(gt) if len(gt) > 0 else 1.0
     
-    word_measures = compute_measures(gt, hyp)
+    # A single editops pass yields the word distance and its S/D/I breakdown
+    word_measures = compute_word_measures(gt_words, hyp_words)
     wer_val = word_measures['wer']
 
     # 2. Accuracy Scores
     char_acc = 1.0 - cer
     word_acc = 1.0 - wer_val
 
-    # 3. String Similarity Scores
-    fuzz = fuzz_ratio(gt, hyp) / 100.0  # Normalize to 0-1 range
-
-    # 4. NLP-based Metrics (BLEU and ROUGE)
-    gt_tokens = [gt.split()]
-    hyp_tokens = hyp.split()
-    
-    # BLEU Score
-    chencherry = SmoothingFunction()
-    bleu = sentence_bleu(gt_tokens, hyp_tokens, smoothing_function=chencherry.method1)
+    # 3. NLP-based Metrics (BLEU and ROUGE)
+    # BLEU Score (sacrebleu tokenizes the raw strings itself, normalized to 0-1)
+    bleu = _BLEU.sentence_score(hyp, [gt]).score / 100.0
     
     # ROUGE-L Score
-    scorer = rouge_scorer.RougeScorer(['rougeL'], use_stemmer=True)
-    rouge_scores = scorer.score(gt, hyp)
+    rouge_scores = _ROUGE_SCORER.score(gt, hyp)
     rouge_l_f1 = rouge_scores['rougeL'].fmeasure
 
     return {
@@ -167,4 +380,65 @@ def compute_all_metrics(gt: str, hyp: str) -> dict:
         'substitutions': word_measures['substitutions'],
         'deletions': word_measures['deletions'],
         'insertions': word_measures['insertions'],
-    }
\ No newline at end of file
+    }
+
+def compute_all_metrics(gt: str, hyp: str) -> dict:
+    """
+    Calculates a comprehensive suite of OCR accuracy and similarity metrics.
+
+    Args:
+        gt: The ground truth text.
+        hyp: The hypothesis (OCR output) text.
+
+    Returns:
+        A dictionary containing all calculated metrics.
+    """
+    trivial = _trivial_metrics(gt, hyp)
+    if trivial is not None:
+        return trivial
+
+    return _scored_metrics(
+        gt, hyp, gt.split(), hyp.split(),
+        lev_dist=Levenshtein.distance(gt, hyp),
+        fuzz=fuzz_ratio(gt, hyp) / 100.0,  # Normalize to 0-1 range
+    )
+
+def compute_all_metrics_batch(gts: list, hyps: list) -> tuple:
+    """
+    Calculates per-page metrics for aligned lists of ground truths and hypotheses,
+    plus a corpus-level BLEU computed in a single sacrebleu call. Each text is split
+    once, and the character distances and fuzz ratios for all pages come from one
+    multithreaded rapidfuzz call each.
+
+    Args:
+        gts: The ground truth texts, one per page.
+        hyps: The hypothesis (OCR output) texts, aligned with `gts`.
+
+    Returns:
+        A tuple of (list of per-page metric dictionaries, corpus BLEU in 0-1 or None).
+    """
+    if len(gts) != len(hyps):
+        raise ValueError(f"Got {len(gts)} ground truths but {len(hyps)} hypotheses.")
+    hyps = [hyp or '' for hyp in hyps]
+
+    results = [_trivial_metrics(gt, hyp) for gt, hyp in zip(gts, hyps)]
+    pending = [i for i, metrics in enumerate(results) if metrics is None]
+    if pending:
+        pending_gts = [gts[i] for i in pending]
+        pending_hyps = [hyps[i] for i in pending]
+        # Element-wise (not all-pairs) distances, computed in C across all cores
+        lev_dists = cpdist(pending_gts, pending_hyps, scorer=Levenshtein.distance, workers=-1)
+        # float64 so the ratios match the per-page path exactly
+        fuzzes = cpdist(pending_gts, pending_hyps, scorer=fuzz_ratio, dtype="float64", workers=-1)
+        for i, gt, hyp, lev_dist, fuzz in zip(pending, pending_gts, pending_hyps, lev_dists, fuzzes):
+            results[i] = _scored_metrics(gt, hyp, gt.split(), hyp.split(),
+                                         lev_dist=int(lev_dist), fuzz=float(fuzz) / 100.0)
+
+    # Pages without ground truth are excluded from the corpus score, as they are per page
+    scored = [(gt, hyp) for gt, hyp in zip(gts, hyps) if gt and gt.strip()]
+    if not scored:
+        return results, None
+    scored_gts, scored_hyps = zip(*scored)
+    corpus_bleu = sacrebleu.corpus_bleu(list(scored_hyps), [list(scored_gts)]).score / 100.0
+
+    return results, corpus_bleu